@@ -1,7 +1,23 @@
 #!/usr/bin/env python3
 import argparse, re
 from pathlib import Path
+import numpy as np
 import pandas as pd
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # falls back to the pandas .str methods
+    pa = pc = None
+
+RX_ALPHA = re.compile(r'[A-Za-z]')
+CSV_CHUNK = 50_000  # rows per to_csv write
+JIT_MIN_CELLS = 20_000_000  # games x splits; below this numba's import+compile costs more than it saves
+
+def read_games_csv(path: Path) -> pd.DataFrame:
+    try:
+        return pd.read_csv(path, engine='pyarrow')  # multithreaded Arrow parser
+    except ImportError:
+        return pd.read_csv(path)
 
 def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     df = df.rename(columns={
@@ -17,60 +33,128 @@ def coerce_types(df: pd.DataFrame) -> pd.DataFrame:
         df['date'] = pd.to_datetime(df['date'], errors='coerce')
     for c in ('goals_for','goals_against'):
         if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors='coerce')
+            df[c] = pd.to_numeric(df[c], errors='coerce', downcast='integer')
     if 'result' in df.columns:
-        df['result'] = df['result'].astype(str).str.upper().str.strip()
+        df['result'] = df['result'].astype(str).str.upper().str.strip().astype('category')
     if 'opponent' in df.columns:
-        df['opponent'] = (
-            df['opponent'].astype(str)
-            .str.replace(r'\s+', ' ', regex=True)
-            .str.strip()
-        )
+        if pc is not None:
+            opp = pa.array(df['opponent'].astype(str), type=pa.string())
+            opp = pc.utf8_trim_whitespace(pc.replace_substring_regex(opp, r'\s+', ' '))
+            df['opponent'] = pd.Series(pd.arrays.ArrowExtensionArray(opp), index=df.index)
+        else:
+            df['opponent'] = (
+                df['opponent'].astype(str)
+                .str.replace(r'\s+', ' ', regex=True)
+                .str.strip()
+            )
     if 'venue' in df.columns:
-        df['venue'] = df['venue'].fillna('').astype(str).str.title()
+        df['venue'] = df['venue'].fillna('').astype(str).str.title().astype('category')
     return df
 
-def infer_venue_and_clean_opponent(row):
-    opp = str(row.get('opponent','')).lstrip('= ').strip()
-    ven = str(row.get('venue','')).strip()
-    m = re.match(r'^(at|vs\.?)\s+(.*)$', opp, flags=re.I)
-    if m:
-        ven = ven or ('Away' if m.group(1).lower().startswith('at') else 'Home')
-        opp = m.group(2)
-    row['opponent'] = opp.title()
-    row['venue'] = ven.title() if ven else ven
-    return row
+def infer_venue_and_clean_opponent(df: pd.DataFrame) -> pd.DataFrame:
+    opp = df['opponent'].astype(str).str.lstrip('= ').str.strip()
+    if 'venue' in df.columns:
+        ven = df['venue'].astype(str).str.strip()
+    else:
+        ven = pd.Series('', index=df.index)
+    # plain prefix tests on the lowered head: at / vs. / vs followed by a space
+    low = opp.str[:4].str.lower()
+    at = low.str.startswith('at ').to_numpy()
+    cut = np.select([low.str.startswith('vs. ').to_numpy(), at | low.str.startswith('vs ').to_numpy()],
+                    [4, 3], 0)
+    has = cut > 0
+    inferred = np.where(at, 'Away', 'Home')
+    rest = np.where(cut == 4, opp.str[4:], np.where(cut == 3, opp.str[3:], opp))
+    if pc is not None:
+        rest = pc.utf8_title(pc.utf8_ltrim_whitespace(pa.array(rest, type=pa.string())))
+        rest = pd.Series(pd.arrays.ArrowExtensionArray(rest), index=df.index)
+    else:
+        rest = pd.Series(rest, index=df.index).str.lstrip().str.title()
+    return df.assign(
+        opponent=rest,
+        venue=pd.Categorical(np.where(has & (ven == '').to_numpy(), inferred, ven.str.title())),
+    )
 
 def clean_filter(df: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
     df = normalize_columns(df)
     df = coerce_types(df)
-    df = df.dropna(subset=['date'])
-    if start: df = df[df['date'] >= pd.Timestamp(start)]
-    if end:   df = df[df['date'] <= pd.Timestamp(end)]
+    # every row predicate goes into one mask so the frame is sliced once
+    m = df['date'].notna().to_numpy(copy=True)
+    if start: m &= (df['date'] >= pd.Timestamp(start)).to_numpy()
+    if end:   m &= (df['date'] <= pd.Timestamp(end)).to_numpy()
     if 'result' in df.columns:
-        df = df[df['result'].isin(['W','L'])]  # drop non-games
-    df = df[(df['goals_for'].between(1,35)) & (df['goals_against'].between(1,35))]
-    # opponent must contain letters (avoid stray numeric/OCR junk)
-    df = df[df['opponent'].str.contains(r'[A-Za-z]', regex=True, na=False)]
+        m &= df['result'].isin(['W','L']).to_numpy()  # drop non-games
+    m &= (df['goals_for'].between(1,35) & df['goals_against'].between(1,35)).to_numpy()
+    # opponent must contain letters (avoid stray numeric/OCR junk); only test surviving rows
+    idx = np.flatnonzero(m)
+    vals = df['opponent'].to_numpy()[idx]
+    has_alpha = RX_ALPHA.search
+    m[idx] = np.fromiter((isinstance(v, str) and has_alpha(v) is not None for v in vals),
+                         dtype=bool, count=len(vals))
+    df = df.loc[m]
     # derive venue tokens inside opponent if present
-    df = df.apply(infer_venue_and_clean_opponent, axis=1)
-    df = df.drop_duplicates(subset=['date','opponent','goals_for','goals_against','result'])
+    df = infer_venue_and_clean_opponent(df)
+    # one uint64 row key; hash_pandas_object mixes columns order-aware, unlike a plain XOR
+    key = pd.util.hash_pandas_object(df[['date','opponent','goals_for','goals_against','result']], index=False)
+    df = df[~key.duplicated().to_numpy()]
     return df.sort_values('date')
 
 def flipped(df: pd.DataFrame, gf_delta=0, ga_delta=0) -> pd.DataFrame:
-    a = df.copy()
-    a['gf_adj'] = a['goals_for'] + gf_delta
-    a['ga_adj'] = (a['goals_against'] - ga_delta).clip(lower=0)
-    mask = (a['result']!='W') & (a['gf_adj'] > a['ga_adj'])
-    return a.loc[mask, ['date','opponent','goals_for','goals_against']]
+    gf, ga, nonwin = game_arrays(df)
+    mask = nonwin & (gf + gf_delta > np.maximum(ga - ga_delta, 0))
+    return df.loc[mask, ['date','opponent','goals_for','goals_against']]
+
+def game_arrays(df: pd.DataFrame):
+    gf = df['goals_for'].to_numpy(dtype=np.int32)
+    ga = df['goals_against'].to_numpy(dtype=np.int32)
+    nonwin = df['result'].to_numpy() != 'W'
+    return gf, ga, nonwin
+
+def _split_counts_loop(gf, ga, nonwin, d):
+    counts = np.zeros(d+1, dtype=np.int64)
+    for k in range(d+1):
+        c = 0
+        for i in range(gf.size):
+            ga_adj = ga[i] - (d-k)
+            if ga_adj < 0:
+                ga_adj = 0
+            if nonwin[i] and gf[i] + k > ga_adj:
+                c += 1
+        counts[k] = c
+    return counts
+
+_split_counts_jit = None  # compiled on the first sweep big enough to need it; False if numba is missing
+
+def _jit_kernel():
+    global _split_counts_jit
+    if _split_counts_jit is None:
+        try:
+            from numba import njit
+        except ImportError:  # the NumPy sweep covers this case
+            _split_counts_jit = False
+        else:
+            _split_counts_jit = njit(_split_counts_loop)
+    return _split_counts_jit or None
+
+def split_counts(gf, ga, nonwin, d: int) -> np.ndarray:
+    # counts[k] = flips with +k GF / -(d-k) GA, for every k in 0..d at once
+    if gf.size * (d+1) >= JIT_MIN_CELLS:
+        kernel = _jit_kernel()
+        if kernel is not None:
+            return kernel(gf, ga, nonwin, d)
+    ks = np.arange(d+1)[:, None]
+    gf_adj = gf[None, :] + ks
+    ga_adj = np.maximum(ga[None, :] - (d-ks), 0)
+    return ((gf_adj > ga_adj) & nonwin[None, :]).sum(axis=1)
+
+def pick_best(counts: np.ndarray, d: int):
+    k = int(counts.argmax())
+    if counts[k] == 0:
+        return (0,0,0)
+    return (int(counts[k]), k, d-k)  # flips, gf_delta, ga_delta
 
 def best_split(df: pd.DataFrame, d: int):
-    best = (0,0,0)  # flips, gf_delta, ga_delta
-    for k in range(d+1):
-        f = len(flipped(df, gf_delta=k, ga_delta=d-k))
-        if f > best[0]:
-            best = (f, k, d-k)
-    return best
+    return pick_best(split_counts(*game_arrays(df), d), d)
 
 def main():
     ap = argparse.ArgumentParser(description="Clean season CSV and run goal-swing sensitivity")
@@ -96,16 +180,15 @@ def main():
         print(f"Input not found: {inp}")
         return
 
-    df_raw = pd.read_csv(inp)
+    df_raw = read_games_csv(inp)
     df = clean_filter(df_raw, start=args.season_start, end=args.season_end)
 
     # Write cleaned + final
     clean_path = outdir / "games_clean.csv"
     final_path = outdir / "games_final.csv"
-    df_out = df.copy()
-    df_out['date'] = df_out['date'].dt.date.astype(str)
-    df_out.to_csv(clean_path, index=False)
-    df_out[['date','opponent','venue','result','goals_for','goals_against']].to_csv(final_path, index=False)
+    df_out = df.assign(date=df['date'].dt.date.astype(str))
+    df_out.to_csv(clean_path, index=False, chunksize=CSV_CHUNK)
+    df_out[['date','opponent','venue','result','goals_for','goals_against']].to_csv(final_path, index=False, chunksize=CSV_CHUNK)
 
     # Basics
     wins = int((df['result']=='W').sum())
@@ -116,10 +199,11 @@ def main():
 
     # Sensitivity table
     lines = []
+    gf, ga, nonwin = game_arrays(df)
     for d in range(1, args.dmax+1):
-        off = len(flipped(df, gf_delta=d))
-        dea = len(flipped(df, ga_delta=d))
-        best_flips, gfd, gad = best_split(df, d)
+        counts = split_counts(gf, ga, nonwin, d)
+        off, dea = int(counts[d]), int(counts[0])  # all-GF / all-GA splits
+        best_flips, gfd, gad = pick_best(counts, d)
         lines.append(f"d={d}: +{d}GF -> {off} flips | -{d}GA -> {dea} flips | best split +{gfd}GF/-{gad}GA -> {best_flips} flips")
     print("\n" + "\n".join(lines))
 
@@ -132,7 +216,9 @@ def main():
             detail_txt.append(f"\n=== Flips with +{d} GF ===\n{f_off.to_string(index=False) if not f_off.empty else '(none)'}")
             detail_txt.append(f"\n=== Flips with -{d} GA ===\n{f_def.to_string(index=False) if not f_def.empty else '(none)'}")
     summary_path = outdir / "flips_summary.txt"
-    open(summary_path, "w").write("\n".join([*lines, *detail_txt]))
+    with open(summary_path, "w", buffering=1 << 20) as f:
+        f.write("\n".join(lines))
+        f.writelines("\n" + t for t in detail_txt)
     print(f"\nWrote: {clean_path}")
     print(f"Wrote: {final_path}")
     print(f"Wrote: {summary_path}")
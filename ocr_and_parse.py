@@ -1,20 +1,37 @@
 #!/usr/bin/env python3
-import argparse, os, re, subprocess, sys, unicodedata, tempfile
-from typing import List, Optional
+import argparse, functools, hashlib, io, itertools, json, os, re, subprocess, sys, unicodedata, tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
 import pandas as pd
-from pdfminer.high_level import extract_text
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+try:
+    import pypdf
+except ImportError:  # pdfminer alone still works, just slower
+    pypdf = None
 
 MONTH = r"(Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:t|tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\.?"
 RX_DATE_NUM  = re.compile(r"\b\d{1,2}/\d{1,2}/\d{2,4}\b")
 RX_DATE_NAME = re.compile(r"\b" + MONTH + r"\s+\d{1,2}(?:,\s*\d{4})?\b", re.IGNORECASE)
 RX_RES       = re.compile(r"\b(W|L|T)\b", re.IGNORECASE)
 RX_SCORE     = re.compile(r"(?<!\d)(\d{1,2})\s*-\s*(\d{1,2})(?!\s*[-/]\d)")
+RX_WS        = re.compile(r"\s+")
+RX_HAN       = re.compile(r"\b(H|A|N)\b")
+RX_LEAD      = re.compile(r"^(at|vs\.?|neutral)\s+", re.IGNORECASE)
+RX_ALPHA     = re.compile(r"[A-Za-z][A-Za-z0-9 .&'()/\-]{2,}")
+ROW_COLS     = ("page","date_raw","opponent","venue","result","goals_for","goals_against","raw")
+TR_CLEAN     = str.maketrans({"\xa0":" ","\u2007":" ","\u2009":" ","\u2013":"-","\u2014":"-"})
+CACHE_DIR    = os.path.join(os.path.expanduser("~"), ".cache", "ocr_and_parse")
+CSV_CHUNK    = 50_000  # rows per to_csv write
+POOL_MIN_PAGES = 48    # below this, process-pool start-up costs more than it saves
 
+@functools.lru_cache(maxsize=4096)  # OCR output repeats many short lines
 def clean(s: str) -> str:
-    s = (s or "").replace("\xa0"," ").replace("\u2007"," ").replace("\u2009"," ")
-    s = s.replace("–","-").replace("—","-").replace("\u2013","-").replace("\u2014","-")
-    s = unicodedata.normalize("NFKC", s)
-    return re.sub(r"\s+"," ", s).strip()
+    if not s: return ""
+    s = unicodedata.normalize("NFKC", s.translate(TR_CLEAN))
+    return RX_WS.sub(" ", s).strip()
 
 def parse_pages_arg(pages: Optional[str], total_pages: int) -> Optional[List[int]]:
     if not pages: return None
@@ -42,46 +59,165 @@ def ocr_if_needed(src_pdf: str, force: bool) -> str:
         print("Warning: ocrmypdf failed; proceeding without OCR.", file=sys.stderr)
         return src_pdf
 
-def extract_pages_text(pdf_path: str, pages_arg: Optional[str]) -> List[str]:
-    full_text = extract_text(pdf_path) or ""
-    pages = [p for p in full_text.split("\f") if p.strip()]
-    if not pages: return []
-    if pages_arg:
-        idxs = parse_pages_arg(pages_arg, len(pages))
-        return [pages[i] for i in idxs]
+def pdf_fingerprint(pdf_path: str) -> str:
+    h = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def load_cached_pages(key: str) -> Optional[List[str]]:
+    path = os.path.join(CACHE_DIR, key + ".json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["pages"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def store_cached_pages(key: str, pages: List[str]) -> None:
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=".json", dir=CACHE_DIR)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"pages": pages}, f)
+        os.replace(tmp, os.path.join(CACHE_DIR, key + ".json"))
+    except OSError as e:
+        print(f"Warning: could not write text cache ({e}).", file=sys.stderr)
+
+def pdfminer_pages(pdf_path: str, idxs: Optional[List[int]] = None) -> List[str]:
+    # one converter run per page, so text is collected page by page instead of as one big string;
+    # with idxs, the result lines up with idxs and pages pdfminer never yields come back as ""
+    want = set(idxs) if idxs is not None else None
+    rsrc=PDFResourceManager(); laparams=LAParams()
+    texts={}
+    with open(pdf_path, "rb") as f:
+        for i, page in enumerate(PDFPage.get_pages(f)):
+            if want is not None and i not in want: continue
+            buf=io.StringIO()
+            dev=TextConverter(rsrc, buf, laparams=laparams)
+            PDFPageInterpreter(rsrc, dev).process_page(page)
+            dev.close()
+            texts[i]=buf.getvalue().rstrip("\f")
+    if idxs is None: return [texts[i] for i in sorted(texts)]
+    return [texts.get(i, "") for i in idxs]
+
+def count_pdf_pages(pdf_path: str) -> int:
+    if pypdf is not None:
+        return len(pypdf.PdfReader(pdf_path).pages)
+    with open(pdf_path, "rb") as f:
+        return sum(1 for _ in PDFPage.get_pages(f))
+
+def read_pdf_pages(pdf_path: str, idxs: Optional[List[int]] = None) -> Tuple[List[str], bool]:
+    # only the pages in idxs (all pages when None) are ever handed to an extractor;
+    # the flag is False when the pdfminer fallback failed, so the text must not be cached
+    if idxs is not None and not idxs: return [], True
+    if pypdf is None:
+        return pdfminer_pages(pdf_path, idxs), True
+    reader = pypdf.PdfReader(pdf_path)
+    if idxs is None: idxs = list(range(len(reader.pages)))
+    pages=[]
+    for i in idxs:
+        try:
+            txt = reader.pages[i].extract_text() or ""
+        except Exception as e:
+            print(f"Warning: pypdf failed on page {i+1} ({e}); trying pdfminer.", file=sys.stderr)
+            txt = ""
+        pages.append(txt)
+    # pypdf comes back empty on some scanned/odd pages; let pdfminer try them all in one pass
+    empty = [j for j, txt in enumerate(pages) if not txt.strip()]
+    if empty:
+        try:
+            retry = pdfminer_pages(pdf_path, [idxs[j] for j in empty])
+        except Exception as e:
+            print(f"Warning: pdfminer fallback failed ({e}); {len(empty)} page(s) left empty.", file=sys.stderr)
+            return pages, False
+        for j, txt in zip(empty, retry):
+            pages[j] = txt
+    return pages, True
+
+def extract_pages_text(pdf_path: str, pages_arg: Optional[str], use_cache: bool = True) -> List[str]:
+    idxs = parse_pages_arg(pages_arg, count_pdf_pages(pdf_path)) if pages_arg else None
+    # text differs between extractors and page selections, so the key records both;
+    # the selection is keyed on the resolved indices, so "3-4", "3,4" and "4,3" share an entry
+    extractor = "pypdf" if pypdf is not None else "pdfminer"
+    key = None
+    if use_cache:
+        key = f"{pdf_fingerprint(pdf_path)}-{extractor}"
+        if idxs is not None: key += "-p" + hashlib.sha1(",".join(map(str, idxs)).encode()).hexdigest()[:12]
+    pages = load_cached_pages(key) if key else None
+    if pages is None:
+        pages, complete = read_pdf_pages(pdf_path, idxs)
+        pages = [p for p in pages if p.strip()]
+        if key and complete: store_cached_pages(key, pages)
     return pages
 
-def parse_schedule_from_text(pages: List[str]) -> pd.DataFrame:
+def parse_dates(raw: pd.Series) -> pd.Series:
+    # date_raw is either M/D/Y or "Month D, YYYY"; parse each family with a fixed format
+    raw=raw.astype(str).str.strip()
+    out=pd.Series(pd.NaT, index=raw.index, dtype="datetime64[ns]")
+    is_num=raw.str.contains("/", regex=False)
+    num=raw[is_num]
+    d=pd.to_datetime(num, format="%m/%d/%Y", errors="coerce")
+    miss=d.isna()
+    d[miss]=pd.to_datetime(num[miss], format="%m/%d/%y", errors="coerce")
+    out[is_num]=d
+    name=(raw[~is_num]
+          .str.replace(r"^([A-Za-z]{3})[A-Za-z]*\.?\s*", r"\1 ", regex=True)
+          .str.replace(r"\s*,\s*", ", ", regex=True))
+    out[~is_num]=pd.to_datetime(name, format="%b %d, %Y", errors="coerce")
+    return out
+
+def _parse_page(arg: Tuple[int, str]) -> List[tuple]:
+    pg_idx, pg = arg
     rows=[]
-    for pg_idx, pg in enumerate(pages,1):
-        L=[clean(x) for x in pg.splitlines()]
-        n=len(L)
-        for i in range(n):
-            for text in (L[i], (L[i]+" "+L[i+1]) if i+1<n else L[i]):
-                if not text: continue
-                m_res=RX_RES.search(text); m_sc=RX_SCORE.search(text)
-                m_dn=RX_DATE_NUM.search(text); m_dm=RX_DATE_NAME.search(text)
-                if not (m_res and m_sc and (m_dn or m_dm)): continue
-                date_str=(m_dn.group(0) if m_dn else m_dm.group(0))
-                date_end=(m_dn.end() if m_dn else m_dm.end())
-                res=m_res.group(1).upper()
-                gf,ga=int(m_sc.group(1)),int(m_sc.group(2))
-                lo=" "+text.lower()+" "
-                if " neutral " in lo: venue="Neutral"
-                elif " at " in lo:    venue="Away"
-                elif " vs " in lo:    venue="Home"
-                else:
-                    m_han=re.search(r"\b(H|A|N)\b",text)
-                    venue={"H":"Home","A":"Away","N":"Neutral"}.get(m_han.group(1),"") if m_han else ""
-                end_pos=min(m_res.start(), m_sc.start())
-                opponent=text[date_end:end_pos]
-                opponent=re.sub(r"^(at|vs\.?|neutral)\s+","",opponent,flags=re.IGNORECASE).strip(" -:|")
-                if len(opponent)<2:
-                    alpha=re.findall(r"[A-Za-z][A-Za-z0-9 .&'()/\-]{2,}",text)
-                    opponent=max(alpha,key=len).strip() if alpha else ""
-                rows.append({"page":pg_idx,"date_raw":date_str,"opponent":opponent,"venue":venue,
-                             "result":res,"goals_for":gf,"goals_against":ga,"raw":text})
-    return pd.DataFrame(rows).drop_duplicates()
+    L=[clean(x) for x in pg.splitlines()]
+    n=len(L)
+    # a result token never straddles the joining space, so per-line hits
+    # decide whether a two-line candidate can match at all
+    has_res=[bool(RX_RES.search(x)) for x in L]
+    for i in range(n):
+        cands=[(L[i], has_res[i])]
+        if i+1<n: cands.append((L[i]+" "+L[i+1], has_res[i] or has_res[i+1]))
+        for text, hit in cands:
+            if not (text and hit): continue
+            m_sc=RX_SCORE.search(text)
+            if not m_sc: continue
+            m_dn=RX_DATE_NUM.search(text); m_dm=None if m_dn else RX_DATE_NAME.search(text)
+            if not (m_dn or m_dm): continue
+            m_res=RX_RES.search(text)
+            date_str=(m_dn.group(0) if m_dn else m_dm.group(0))
+            date_end=(m_dn.end() if m_dn else m_dm.end())
+            res=m_res.group(1).upper()
+            gf,ga=int(m_sc.group(1)),int(m_sc.group(2))
+            lo=" "+text.lower()+" "
+            if " neutral " in lo: venue="Neutral"
+            elif " at " in lo:    venue="Away"
+            elif " vs " in lo:    venue="Home"
+            else:
+                m_han=RX_HAN.search(text)
+                venue={"H":"Home","A":"Away","N":"Neutral"}.get(m_han.group(1),"") if m_han else ""
+            end_pos=min(m_res.start(), m_sc.start())
+            opponent=text[date_end:end_pos]
+            opponent=RX_LEAD.sub("",opponent).strip(" -:|")
+            if len(opponent)<2:
+                alpha=RX_ALPHA.findall(text)
+                opponent=max(alpha,key=len).strip() if alpha else ""
+            rows.append((pg_idx, date_str, opponent, venue, res, gf, ga, text))
+            break  # a full record on L[i] alone; the two-line form would only re-scan it
+    return rows
+
+def parse_schedule_from_text(pages: List[str]) -> pd.DataFrame:
+    # pages are independent, but a page parses in well under a millisecond, so worker
+    # processes only pay off for long documents on multi-core machines
+    cpus=os.cpu_count() or 1
+    if cpus > 1 and len(pages) > POOL_MIN_PAGES:
+        chunk=max(1, len(pages)//cpus)
+        with ProcessPoolExecutor() as ex:
+            results=list(ex.map(_parse_page, enumerate(pages,1), chunksize=chunk))
+    else:
+        results=[_parse_page(a) for a in enumerate(pages,1)]
+    rows=list(itertools.chain.from_iterable(results))
+    return pd.DataFrame.from_records(rows, columns=ROW_COLS).drop_duplicates()
 
 def main():
     ap=argparse.ArgumentParser(description="OCR + parse season PDF into games.csv")
@@ -93,25 +229,29 @@ def main():
     ap.add_argument("--season-start", default=None)
     ap.add_argument("--season-end", default=None)
     ap.add_argument("--dump-text", action="store_true")
+    ap.add_argument("--no-cache", action="store_true", help="Re-extract PDF text instead of reusing the cache")
     args=ap.parse_args()
 
     os.makedirs(args.outdir, exist_ok=True)
     pdf_for_parse=ocr_if_needed(args.pdf, args.force_ocr)
 
-    pages_text=extract_pages_text(pdf_for_parse, args.pages)
+    pages_text=extract_pages_text(pdf_for_parse, args.pages, use_cache=not args.no_cache)
     if not pages_text:
         print("No text extracted from PDF. Try --force-ocr.", file=sys.stderr); sys.exit(2)
 
     if args.dump_text:
         txt_dir=os.path.join(args.outdir,"pdf_text_dump"); os.makedirs(txt_dir, exist_ok=True)
         for i,pg in enumerate(pages_text,1):
-            open(os.path.join(txt_dir,f"page{i:02d}.txt"),"w",encoding="utf-8").write(pg)
+            with open(os.path.join(txt_dir,f"page{i:02d}.txt"),"w",encoding="utf-8") as f: f.write(pg)
 
     df=parse_schedule_from_text(pages_text)
     if df.empty:
         print("Parsed 0 schedule rows. Try adjusting --pages or use --force-ocr.", file=sys.stderr); sys.exit(3)
 
-    df["date"]=pd.to_datetime(df["date_raw"], errors="coerce")
+    df=df.astype({"result":"category","venue":"category"})
+    for c in ("goals_for","goals_against"):
+        df[c]=pd.to_numeric(df[c], downcast="integer")
+    df["date"]=parse_dates(df["date_raw"])
     df=df.dropna(subset=["date"])
     if args.season_start: df=df[df["date"]>=pd.Timestamp(args.season_start)]
     if args.season_end:   df=df[df["date"]<=pd.Timestamp(args.season_end)]
@@ -123,7 +263,7 @@ def main():
     out["date"]=out["date"].dt.date.astype(str)
 
     out_path=os.path.join(args.outdir, args.outfile)
-    out.to_csv(out_path, index=False)
+    out.to_csv(out_path, index=False, chunksize=CSV_CHUNK)
 
     wins=int((out["result"]=="W").sum()); losses=int((out["result"]=="L").sum()); ties=int((out["result"]=="T").sum())
     print(f"Wrote {out_path} with {len(out)} rows")